@@ -168,7 +168,7 @@ class MEDSMaker(dict):
 
         cutout_hdu = self._get_cutout_hdu(cutout_type)
 
-        for file_id in xrange(nfile):
+        for file_id in range(nfile):
 
             pkey   = '%s_path' % cutout_type
             impath = self.image_info[pkey][file_id].strip()
@@ -181,10 +181,10 @@ class MEDSMaker(dict):
                 print('    no %s specified for file' % cutout_type)
                 continue
 
-            for iobj in xrange(nobj):
+            for iobj in range(nobj):
                 ncut=obj_data['ncutout'][iobj]
 
-                for icut in xrange(ncut):
+                for icut in range(ncut):
                     if obj_data['file_id'][iobj, icut] == file_id:
                         self._write_cutout(iobj,icut,cutout_hdu,im_data)
 
@@ -379,7 +379,7 @@ class MEDSMaker(dict):
         nim  = self.image_info.size
         nobj = obj_data.size
 
-        for file_id in xrange(nim):
+        for file_id in range(nim):
 
             self._get_wcs(file_id)
             impath=self.image_info['image_path'][file_id].strip()
@@ -465,13 +465,13 @@ class MEDSMaker(dict):
 
         npix=0
         current_row = 0
-        for iobj in xrange(nobj):
+        for iobj in range(nobj):
             ncut = data['ncutout'][iobj]
             if ncut > 0:
                 bsize=data['box_size'][iobj]
                 npix_per_cutout = bsize*bsize
 
-                for icut in xrange(ncut):
+                for icut in range(ncut):
                     data['start_row'][iobj,icut] = current_row
                     current_row += npix_per_cutout
                     npix += npix_per_cutout
@@ -20,6 +20,8 @@ See docs for the MEDS class for more info
 """
 
 from __future__ import print_function
+import mmap
+
 import numpy
 import fitsio
 
@@ -30,6 +32,12 @@ except ImportError:
     print("could not load fast ubserseg")
     _have_c_ubserseg=False
 
+try:
+    import numba
+    _have_numba=True
+except ImportError:
+    _have_numba=False
+
 class MEDS(object):
     """
     Class to work with MEDS (Multi Epoch Data Structures)
@@ -53,6 +61,8 @@ class MEDS(object):
         Get a single cutout for the indicated entry
     get_mosaic(iobj)
         Get a mosaic of all cutouts associated with this coadd object
+    get_mosaic_batch(iobjs)
+        Get mosaics for a set of objects, coalescing adjacent reads
     get_cutout_list(iobj)
         Get an image list with all cutouts associated with this coadd object
 
@@ -92,6 +102,8 @@ class MEDS(object):
         Get the jacobian as a numpy matrix
     get_jacobian_list(iobj)
         Get the list of jacobians for all cutouts for this object.
+    get_jacobian_inv_array(iobj)
+        Get the inverse jacobians for all cutouts for this object.
 
     stand alone function
 
@@ -177,17 +189,91 @@ class MEDS(object):
     """
     def __init__(self, filename):
         self._filename=filename
-        
+
         self._fits=fitsio.FITS(filename)
 
-        self._cat=self._fits["object_data"][:]
-        self._image_info=self._fits["image_info"][:]
-        self._meta=self._fits["metadata"][:]
+        # the catalog, image info and metadata are read lazily
+        # on first access
+        self.__cat=None
+        self.__image_info=None
+        self.__meta=None
+        self.__box2=None
+        self.__colnames=None
+        self.__nrows=None
+        self.__image_paths=None
+        self.__sky_paths=None
+
+        # cache of individual catalog columns; reading a single
+        # column is much cheaper than the full table
+        self._col_cache={}
+
+        # cache of cutout HDU handles keyed by cutout type, to avoid
+        # a name lookup in the fits object on every read
+        self._hdu_cache={}
+
+        # cache of memory-mapped cutout data keyed by cutout type;
+        # None means the extension cannot be mapped
+        self._mmap_cache={}
+
+    @property
+    def _cat(self):
+        if self.__cat is None:
+            self.__cat=self._fits["object_data"][:]
+        return self.__cat
+
+    @property
+    def _image_info(self):
+        if self.__image_info is None:
+            self.__image_info=self._fits["image_info"][:]
+        return self.__image_info
+
+    @property
+    def _meta(self):
+        if self.__meta is None:
+            self.__meta=self._fits["metadata"][:]
+        return self.__meta
+
+    @property
+    def _box2(self):
+        """
+        number of pixels in each cutout, per object
+        """
+        if self.__box2 is None:
+            self.__box2 = self['box_size'].astype(numpy.int64)**2
+        return self.__box2
+
+    @property
+    def _image_paths(self):
+        """
+        the image_path column from the image info, as an array
+        """
+        if self.__image_paths is None:
+            self.__image_paths=self._fits["image_info"]["image_path"][:]
+        return self.__image_paths
+
+    @property
+    def _sky_paths(self):
+        """
+        the sky_path column from the image info, as an array
+        """
+        if self.__sky_paths is None:
+            self.__sky_paths=self._fits["image_info"]["sky_path"][:]
+        return self.__sky_paths
+
+    @property
+    def _colnames(self):
+        """
+        names of the columns in the object_data table
+        """
+        if self.__colnames is None:
+            self.__colnames=self._fits["object_data"].get_colnames()
+        return self.__colnames
 
     def close(self):
+        self._mmap_cache={}
         self._fits.close()
     
-    def get_cutout(self, iobj, icutout, type='image'):
+    def get_cutout(self, iobj, icutout, type='image', _unchecked=False):
         """
         Get a single cutout for the indicated entry
 
@@ -200,24 +286,28 @@ class MEDS(object):
         type: string, optional
             Cutout type. Default is 'image'.  Allowed
             values are 'image','weight','seg','bmask'
+        _unchecked: bool, optional
+            If True, skip the index bounds checks.  For tight loops
+            where the caller has already validated the indices.
 
         returns
         -------
-        The cutout image
+        The cutout image.  For memory-mapped extensions this is a
+        read-only view with the big-endian byte order of the file;
+        copy it before modifying.
         """
-        self._check_indices(iobj, icutout=icutout)
+        if not _unchecked:
+            self._check_indices(iobj, icutout=icutout)
 
-        box_size=self._cat['box_size'][iobj]
-        start_row = self._cat['start_row'][iobj,icutout]
-        row_end = start_row + box_size*box_size
+        box_size=self['box_size'][iobj]
+        start_row = self['start_row'][iobj,icutout]
+        row_end = start_row + self._box2[iobj]
 
-        extname=self._get_extension_name(type)
-
-        imflat = self._fits[extname][start_row:row_end]
+        imflat = self._read_cutout_range(type, start_row, row_end)
         im = imflat.reshape(box_size,box_size)
         return im
 
-    def get_mosaic(self, iobj, type='image'):
+    def get_mosaic(self, iobj, type='image', _unchecked=False):
         """
         Get a mosaic of all cutouts associated with this coadd object
 
@@ -231,24 +321,90 @@ class MEDS(object):
 
         returns
         -------
-        An image holding all cutouts
+        An image holding all cutouts.  For memory-mapped extensions
+        this is a read-only view with the big-endian byte order of
+        the file; copy it before modifying.
         """
 
-        self._check_indices(iobj)
-
-        ncutout=self._cat['ncutout'][iobj]
-        box_size=self._cat['box_size'][iobj]
+        if not _unchecked:
+            self._check_indices(iobj)
 
-        start_row = self._cat['start_row'][iobj,0]
-        row_end = start_row + box_size*box_size*ncutout
+        ncutout=self['ncutout'][iobj]
+        box_size=self['box_size'][iobj]
 
-        extname=self._get_extension_name(type)
+        start_row = self['start_row'][iobj,0]
+        row_end = start_row + self._box2[iobj]*ncutout
 
-        mflat=self._fits[extname][start_row:row_end]
+        mflat=self._read_cutout_range(type, start_row, row_end)
         mosaic=mflat.reshape(ncutout*box_size, box_size)
 
         return mosaic
 
+    def get_mosaic_batch(self, iobjs, type='image'):
+        """
+        Get mosaics for a set of objects, coalescing reads of objects
+        that are adjacent on disk into single FITS range reads
+
+        Each run of contiguous objects costs one read instead of one
+        per object, which matters when pulling many small objects.
+
+        parameters
+        ----------
+        iobjs: sequence
+            Indices of the objects
+        type: string, optional
+            Cutout type. Default is 'image'.  Allowed
+            values are 'image','weight','seg'
+
+        returns
+        -------
+        A list of mosaics, ordered like iobjs
+        """
+
+        iobjs=numpy.atleast_1d(iobjs).astype('i8')
+        if iobjs.size == 0:
+            return []
+
+        for iobj in iobjs:
+            self._check_indices(iobj)
+
+        ncutout=self['ncutout']
+        box_size=self['box_size']
+
+        starts=self['start_row'][iobjs,0]
+        npix=self._box2[iobjs]*ncutout[iobjs]
+
+        sind=numpy.argsort(starts)
+
+        hdu=self._get_hdu(type)
+
+        mosaics=[None]*iobjs.size
+
+        i=0
+        while i < sind.size:
+            # extend the run while the next object starts where the
+            # current one ends
+            j=i
+            run_end=starts[sind[i]] + npix[sind[i]]
+            while j+1 < sind.size and starts[sind[j+1]] == run_end:
+                j += 1
+                run_end += npix[sind[j]]
+
+            data=hdu[starts[sind[i]]:run_end]
+
+            offset=0
+            for k in range(i, j+1):
+                ind=sind[k]
+                iobj=iobjs[ind]
+                n=npix[ind]
+                bs=box_size[iobj]
+                mosaics[ind]=data[offset:offset+n].reshape(ncutout[iobj]*bs, bs)
+                offset += n
+
+            i=j+1
+
+        return mosaics
+
     def get_cutout_list(self, iobj, type='image'):
         """
         Get an image list with all cutouts associated with this coadd object
@@ -270,8 +426,6 @@ class MEDS(object):
         """
 
         mosaic=self.get_mosaic(iobj,type=type)
-        ncutout=self._cat['ncutout'][iobj]
-        box_size=self._cat['box_size'][iobj]
         return split_mosaic(mosaic)
 
     def get_psf(self, iobj, icutout):
@@ -295,8 +449,8 @@ class MEDS(object):
 
         self._check_indices(iobj, icutout=icutout)
 
-        box_size=self._cat['psf_box_size'][iobj]
-        start_row = self._cat['psf_start_row'][iobj,icutout]
+        box_size=self['psf_box_size'][iobj]
+        start_row = self['psf_start_row'][iobj,icutout]
         row_end = start_row + box_size*box_size
 
         imflat = self._fits['psf'][start_row:row_end]
@@ -320,8 +474,7 @@ class MEDS(object):
         -------
         The weight map
         """
-        wt=self.get_cutout(iobj, icutout, type='weight')
-        coadd_seg=self.get_cutout(iobj, 0, type='seg')
+        wt, coadd_seg = self._read_weight_and_coadd_seg(iobj, icutout)
         cwt=self._make_composite_image(iobj, icutout, wt, coadd_seg)
         return cwt
 
@@ -340,18 +493,17 @@ class MEDS(object):
         -------
         A composite of all weight maps
         """
-        wtmosaic=self.get_mosaic(iobj, type='weight')
-        coadd_seg=self.get_cutout(iobj, 0, type='seg')
-
-        ncutout=self._cat['ncutout'][iobj]
-        box_size=self._cat['box_size'][iobj]
+        wtmosaic, coadd_seg = self._read_weight_and_coadd_seg(iobj)
 
         # shares underlying storage
-        wlist = split_mosaic(wtmosaic)
+        warr = _split_mosaic_3d(wtmosaic)
 
-        for icutout,wt in enumerate(wlist):
-            cwt=self._make_composite_image(iobj, icutout, wt, coadd_seg)
-            wt[:,:] = cwt[:,:]
+        ctx=self._get_composite_ctx(iobj, coadd_seg)
+
+        for icutout in range(warr.shape[0]):
+            wt=warr[icutout]
+            self._make_composite_image(iobj, icutout, wt, coadd_seg,
+                                       ctx=ctx, out=wt)
 
         return wtmosaic
 
@@ -372,9 +524,6 @@ class MEDS(object):
         """
         wtmosaic=self.get_cweight_mosaic(iobj)
 
-        ncutout=self._cat['ncutout'][iobj]
-        box_size=self._cat['box_size'][iobj]
-
         # shares underlying storage
         wlist = split_mosaic(wtmosaic)
         return wlist
@@ -455,7 +604,10 @@ class MEDS(object):
         -------
         The seg map
         """
+        # fresh native-order copy; the cutout may be a read-only
+        # big-endian view from a memory-mapped extension
         seg=self.get_cutout(iobj, icutout, type='seg')
+        seg=seg.astype(seg.dtype.newbyteorder('='))
         seg[:,:] = self.get_number(iobj)
 
         coadd_seg=self.get_cutout(iobj, 0, type='seg')
@@ -480,20 +632,23 @@ class MEDS(object):
         -------
         A mosaic of all seg maps
         """
+        # fresh native-order copy; the mosaic may be a read-only
+        # big-endian view from a memory-mapped extension
         segmosaic=self.get_mosaic(iobj, type='seg')
+        segmosaic=segmosaic.astype(segmosaic.dtype.newbyteorder('='))
         segmosaic[:,:] = self.get_number(iobj)
 
         coadd_seg=self.get_cutout(iobj, 0, type='seg')
 
-        ncutout=self._cat['ncutout'][iobj]
-        box_size=self._cat['box_size'][iobj]
-
         # shares underlying storage
-        wlist = split_mosaic(segmosaic)
+        segarr = _split_mosaic_3d(segmosaic)
+
+        ctx=self._get_composite_ctx(iobj, coadd_seg)
 
-        for icutout,seg in enumerate(wlist):
-            cseg=self._make_composite_image(iobj, icutout, seg, coadd_seg)
-            seg[:,:] = cseg[:,:]
+        for icutout in range(segarr.shape[0]):
+            seg=segarr[icutout]
+            self._make_composite_image(iobj, icutout, seg, coadd_seg,
+                                       ctx=ctx, out=seg)
 
         return segmosaic
 
@@ -516,9 +671,6 @@ class MEDS(object):
         """
         segmosaic=self.get_cseg_mosaic(iobj)
 
-        ncutout=self._cat['ncutout'][iobj]
-        box_size=self._cat['box_size'][iobj]
-
         # shares underlying storage
         seglist = split_mosaic(segmosaic)
         return seglist
@@ -527,7 +679,10 @@ class MEDS(object):
         """
         get a mosaic of interpolated seg maps
         """
+        # fresh native-order copy; the mosaic may be a read-only
+        # big-endian view from a memory-mapped extension
         seg_mosaic=self.get_mosaic(iobj,type='seg')
+        seg_mosaic=seg_mosaic.astype(seg_mosaic.dtype.newbyteorder('='))
 
         segs=split_mosaic(seg_mosaic)
 
@@ -565,13 +720,14 @@ class MEDS(object):
         rowcen=self['cutout_row'][iobj,icutout]
         colcen=self['cutout_col'][iobj,icutout]
 
-        # rows in SE seg mape
-        rows,cols=numpy.mgrid[0:seg.shape[0], 0:seg.shape[1]]
-        rowsrel = rows-rowcen
-        colsrel = cols-colcen
+        # relative row/col in the SE seg map; broadcasting against
+        # these is equivalent to the full grid without materializing it
+        rowsrel = numpy.arange(seg.shape[0])[:,None] - rowcen
+        colsrel = numpy.arange(seg.shape[1])[None,:] - colcen
 
-        # this will raise a numpy.linalg.linalg.LinAlgError exception
-        cjinv = coadd_jacob.getI()
+        cjinv = _invert_jacobian(coadd_jacob)
+        if cjinv is None:
+            raise numpy.linalg.LinAlgError("coadd jacobian is singular")
 
         # convert pixel coords in SE cutout to u,v
         u = rowsrel*se_jacob[0,0] + colsrel*se_jacob[0,1]
@@ -588,11 +744,11 @@ class MEDS(object):
         crow = crow.clip(0,coadd_seg.shape[0]-1)
         ccol = ccol.clip(0,coadd_seg.shape[1]-1)
 
-        seg[rows, cols] = coadd_seg[crow, ccol]
+        seg[:,:] = coadd_seg[crow, ccol]
 
         return seg
 
-    def get_source_info(self, iobj, icutout):
+    def get_source_info(self, iobj, icutout, _unchecked=False):
         """
         Get the full source file information for the indicated cutout.
 
@@ -603,8 +759,9 @@ class MEDS(object):
         iobj: 
             Index of the object
         """
-        self._check_indices(iobj, icutout=icutout)
-        ifile=self._cat['file_id'][iobj,icutout]
+        if not _unchecked:
+            self._check_indices(iobj, icutout=icutout)
+        ifile=self['file_id'][iobj,icutout]
         return self._image_info[ifile]
 
     def get_source_path(self, iobj, icutout):
@@ -623,8 +780,9 @@ class MEDS(object):
         The filename
         """
 
-        info=self.get_source_info(iobj, icutout)
-        return info['image_path']
+        self._check_indices(iobj, icutout=icutout)
+        ifile=self['file_id'][iobj,icutout]
+        return self._image_paths[ifile]
 
     def get_sky_path(self, iobj, icutout):
         """
@@ -642,8 +800,9 @@ class MEDS(object):
         The filename
         """
 
-        info=self.get_source_info(iobj, icutout)
-        return info['sky_path']
+        self._check_indices(iobj, icutout=icutout)
+        ifile=self['file_id'][iobj,icutout]
+        return self._sky_paths[ifile]
 
 
     def get_cat(self):
@@ -664,7 +823,7 @@ class MEDS(object):
         """
         return self._meta
 
-    def get_jacobian(self, iobj, icutout):
+    def get_jacobian(self, iobj, icutout, _unchecked=False):
         """
         Get the jacobian as a dict keyed by
 
@@ -682,7 +841,8 @@ class MEDS(object):
         icutout:
             Index of the cutout for this object.
         """
-        self._check_indices(iobj,icutout=icutout)
+        if not _unchecked:
+            self._check_indices(iobj,icutout=icutout)
 
         row0   = self['cutout_row'][iobj,icutout]
         col0   = self['cutout_col'][iobj,icutout]
@@ -700,7 +860,7 @@ class MEDS(object):
 
     def get_jacobian_matrix(self, iobj, icutout):
         """
-        Get the jacobian as a numpy matrix
+        Get the jacobian as a 2x2 numpy array
 
         parameters
         ----------
@@ -711,18 +871,14 @@ class MEDS(object):
 
         returns
         -------
-        A 2x2 matrix of the jacobian
+        A 2x2 array of the jacobian
             dudrow dudcol
             dvdrow dvdcol
         """
-        jacob=numpy.matrix( numpy.zeros( (2,2) ), copy=False)
-
-        jacob[0,0] = self['dudrow'][iobj,icutout]
-        jacob[0,1] = self['dudcol'][iobj,icutout]
-        jacob[1,0] = self['dvdrow'][iobj,icutout]
-        jacob[1,1] = self['dvdcol'][iobj,icutout]
-
-        return jacob
+        return numpy.array(
+            [[self['dudrow'][iobj,icutout], self['dudcol'][iobj,icutout]],
+             [self['dvdrow'][iobj,icutout], self['dvdcol'][iobj,icutout]]],
+        )
 
 
     def get_jacobian_list(self, iobj):
@@ -736,86 +892,294 @@ class MEDS(object):
             Index of the object
         """
         self._check_indices(iobj)
-        jlist=[]
-        for icutout in xrange(self['ncutout'][iobj]):
-            j=self.get_jacobian(iobj, icutout)
-            jlist.append(j)
 
-        return jlist
+        ncutout=self['ncutout'][iobj]
+
+        row0   = self['cutout_row'][iobj,0:ncutout]
+        col0   = self['cutout_col'][iobj,0:ncutout]
+        dudrow = self['dudrow'][iobj,0:ncutout]
+        dudcol = self['dudcol'][iobj,0:ncutout]
+        dvdrow = self['dvdrow'][iobj,0:ncutout]
+        dvdcol = self['dvdcol'][iobj,0:ncutout]
+
+        return [{'row0':row0[i],
+                 'col0':col0[i],
+                 'dudrow':dudrow[i],
+                 'dudcol':dudcol[i],
+                 'dvdrow':dvdrow[i],
+                 'dvdcol':dvdcol[i]} for i in range(ncutout)]
+
+    def get_jacobian_inv_array(self, iobj):
+        """
+        Get the inverse jacobians for all cutouts for this object
+        as an (ncutout, 2, 2) array
+
+        The inverses are computed with the closed-form 2x2 formula in
+        a single vectorized pass, which is much faster than inverting
+        per cutout when iterating many objects.
+
+        parameters
+        ----------
+        iobj:
+            Index of the object
+
+        returns
+        -------
+        An (ncutout, 2, 2) array of inverse jacobians
+        """
+        self._check_indices(iobj)
+
+        ncutout=self['ncutout'][iobj]
+
+        jacob=numpy.empty( (ncutout, 2, 2) )
+        jacob[:,0,0] = self['dudrow'][iobj,0:ncutout]
+        jacob[:,0,1] = self['dudcol'][iobj,0:ncutout]
+        jacob[:,1,0] = self['dvdrow'][iobj,0:ncutout]
+        jacob[:,1,1] = self['dvdcol'][iobj,0:ncutout]
+
+        det = jacob[:,0,0]*jacob[:,1,1] - jacob[:,0,1]*jacob[:,1,0]
+        if numpy.any(det == 0.0):
+            raise numpy.linalg.LinAlgError(
+                "jacobian is singular for object %s" % iobj
+            )
+
+        jinv=numpy.empty_like(jacob)
+        jinv[:,0,0] =  jacob[:,1,1]
+        jinv[:,0,1] = -jacob[:,0,1]
+        jinv[:,1,0] = -jacob[:,1,0]
+        jinv[:,1,1] =  jacob[:,0,0]
+        jinv /= det[:,None,None]
+
+        return jinv
 
     def get_number(self, iobj):
         """
         Old versions of the meds files did not have number
         from the sextractor catalog
         """
-        if 'number' not in self._cat.dtype.names:
+        if 'number' not in self._colnames:
             return iobj+1
         else:
-            return self._cat['number'][iobj]
+            return self['number'][iobj]
 
-    def _make_composite_image(self, iobj, icutout, im, coadd_seg):
+    def _read_weight_and_coadd_seg(self, iobj, icutout=None):
+        """
+        Read the weight data and the coadd seg cutout for the
+        indicated object, issuing a single contiguous range read
+        per extension.
+
+        If icutout is sent, the weight for that single cutout is
+        read, otherwise the full weight mosaic is read.
+        """
+        self._check_indices(iobj, icutout=icutout)
+
+        box_size=self['box_size'][iobj]
+        npix=self._box2[iobj]
+
+        if icutout is not None:
+            wt_start = self['start_row'][iobj,icutout]
+            wt_end   = wt_start + npix
+            wt_shape = (box_size, box_size)
+        else:
+            ncutout=self['ncutout'][iobj]
+            wt_start = self['start_row'][iobj,0]
+            wt_end   = wt_start + npix*ncutout
+            wt_shape = (ncutout*box_size, box_size)
+
+        seg_start = self['start_row'][iobj,0]
+        seg_end   = seg_start + npix
+
+        wt=self._get_hdu('weight')[wt_start:wt_end]
+        wt=wt.reshape(wt_shape)
+
+        coadd_seg=self._get_hdu('seg')[seg_start:seg_end]
+        coadd_seg=coadd_seg.reshape(box_size,box_size)
+
+        return wt, coadd_seg
+
+    def _get_composite_ctx(self, iobj, coadd_seg):
+        """
+        Precompute the per-object quantities used when compositing the
+        coadd seg onto each cutout: the coadd center, the seg id at the
+        center, and the coadd jacobian inverse.
+        """
+        coadd_rowcen=self['cutout_row'][iobj,0]
+        coadd_colcen=self['cutout_col'][iobj,0]
+
+        # the centers are f8 columns; indexing requires ints
+        segid=coadd_seg[int(coadd_rowcen),int(coadd_colcen)]
+
+        cjinv=_invert_jacobian(self.get_jacobian_matrix(iobj, 0))
+
+        return coadd_rowcen, coadd_colcen, segid, cjinv
+
+    def _make_composite_image(self, iobj, icutout, im, coadd_seg, ctx=None,
+                              out=None):
         """
         Internal routine to composite the coadd seg onto another image,
         meaning set zero outside the region
 
         for the coadd this is easy, but for SE cutouts we need to use the
         jacobian to transform between SE and coadd coordinate systems
+
+        ctx is the output of _get_composite_ctx for this object; send it
+        when calling in a loop over cutouts to avoid recomputing it
+
+        out is an optional output image; it may be im itself, in which
+        case the compositing is done in place with no copy
         """
-        
-        cim=im.copy()
 
-        coadd_rowcen=self['cutout_row'][iobj,0]
-        coadd_colcen=self['cutout_col'][iobj,0]
+        if out is None:
+            cim=im.copy()
+        elif out is im:
+            cim=im
+        else:
+            out[:,:]=im
+            cim=out
+
+        if ctx is None:
+            ctx=self._get_composite_ctx(iobj, coadd_seg)
+        coadd_rowcen, coadd_colcen, segid, cjinv = ctx
+
         rowcen=self['cutout_row'][iobj,icutout]
         colcen=self['cutout_col'][iobj,icutout]
 
-        segid=coadd_seg[coadd_rowcen,coadd_colcen]
-
         if icutout==0:
             # this cutout is the coadd
             w=numpy.where( (coadd_seg != segid) & (coadd_seg != 0) )
             if w[0].size != 0:
                 cim[w] = 0.0
         else:
-            rows,cols=numpy.mgrid[0:cim.shape[0], 0:cim.shape[1]]
-            rows = rows-rowcen
-            cols = cols-colcen
-
             se_jacob=self.get_jacobian_matrix(iobj, icutout)
-            coadd_jacob=self.get_jacobian_matrix(iobj, 0)
 
-            try:
-                cjinv = coadd_jacob.getI()
-            except numpy.linalg.linalg.LinAlgError:
+            if cjinv is None:
                 print('coadd jacobian is singular, setting weight to zero')
                 cim[:,:] = 0.0
                 return cim
 
-            # convert pixel coords in SE cutout to u,v
-            u = rows*se_jacob[0,0] + cols*se_jacob[0,1]
-            v = rows*se_jacob[1,0] + cols*se_jacob[1,1]
+            # the coadd pixel coords are affine in the SE pixel coords;
+            # fold the SE jacobian and the coadd jacobian inverse into
+            # four scalar coefficients rather than materializing the
+            # intermediate u,v arrays
+            arow = se_jacob[0,0]*cjinv[0,0] + se_jacob[1,0]*cjinv[0,1]
+            brow = se_jacob[0,1]*cjinv[0,0] + se_jacob[1,1]*cjinv[0,1]
+            acol = se_jacob[0,0]*cjinv[1,0] + se_jacob[1,0]*cjinv[1,1]
+            bcol = se_jacob[0,1]*cjinv[1,0] + se_jacob[1,1]*cjinv[1,1]
+
+            if _have_numba:
+                # numba cannot type non-native (e.g. memory-mapped big
+                # endian) arrays
+                kim=_as_native(cim)
+                _composite_image_kernel(kim, _as_native(coadd_seg),
+                                        rowcen, colcen,
+                                        coadd_rowcen, coadd_colcen,
+                                        arow, brow, acol, bcol,
+                                        segid)
+                if kim is not cim:
+                    cim[:,:]=kim
+            else:
+                rows = numpy.arange(cim.shape[0])[:,None] - rowcen
+                cols = numpy.arange(cim.shape[1])[None,:] - colcen
+
+                crow = numpy.rint(coadd_rowcen + rows*arow + cols*brow)
+                ccol = numpy.rint(coadd_colcen + rows*acol + cols*bcol)
+
+                crow = crow.astype(numpy.intp)
+                ccol = ccol.astype(numpy.intp)
+
+                oob = (  (crow < 0) | (crow >= coadd_seg.shape[0])
+                       | (ccol < 0) | (ccol >= coadd_seg.shape[1]) )
+
+                # clipping makes the seg indexing safe
+                numpy.clip(crow, 0, coadd_seg.shape[0]-1, out=crow)
+                numpy.clip(ccol, 0, coadd_seg.shape[1]-1, out=ccol)
+
+                segpix = coadd_seg[crow,ccol]
+                bad = oob | ( (segpix != segid) & (segpix != 0) )
+                cim[bad] = 0
 
-            # now convert into pixels for coadd
-            crow = coadd_rowcen + u*cjinv[0,0] + v*cjinv[0,1]
-            ccol = coadd_colcen + u*cjinv[1,0] + v*cjinv[1,1]
+        return cim
 
-            crow = crow.round().astype('i8')
-            ccol = ccol.round().astype('i8')
 
-            wbad=numpy.where(   (crow < 0) | (crow >= coadd_seg.shape[0])
-                              & (ccol < 0) | (ccol >= coadd_seg.shape[1]) )
-            if wbad[0].size != 0:
-                cim[wbad] = 0
+    def _read_cutout_range(self, type, start_row, row_end):
+        """
+        Read a flat pixel range from the indicated cutouts extension.
 
-            # clipping makes the notation easier
-            crow = crow.clip(0,coadd_seg.shape[0]-1)
-            ccol = ccol.clip(0,coadd_seg.shape[1]-1)
-            wbad=numpy.where( (coadd_seg[crow,ccol] != segid ) & (coadd_seg[crow,ccol] != 0) )
-            if wbad[0].size != 0:
-                cim[wbad] = 0
+        When the extension is memory mapped this is a zero-copy,
+        read-only view served from the OS page cache; otherwise it is
+        a fresh array from a fitsio range read.
+        """
+        mapped=self._get_mmap(type)
+        if mapped is not None:
+            return mapped[start_row:row_end]
+        return self._get_hdu(type)[start_row:row_end]
 
-        return cim
+    def _get_mmap(self, type):
+        """
+        Get memory-mapped data for the indicated cutouts extension,
+        or None if the extension cannot be mapped
+        """
+        if type not in self._mmap_cache:
+            self._mmap_cache[type]=self._try_mmap(type)
+        return self._mmap_cache[type]
 
+    def _try_mmap(self, type):
+        """
+        Attempt to memory map the data region of the indicated cutouts
+        extension, returning None if it is not safe to do so
+        """
+        # weight maps are commonly modified in place by callers, for
+        # example reject_outliers and the composite weight machinery;
+        # always serve them as writable copies
+        if type=='weight':
+            return None
+
+        hdu=self._get_hdu(type)
+        try:
+            if hdu.is_compressed():
+                return None
+
+            dims=hdu.get_info()['dims']
+            if len(dims) != 1:
+                return None
+            count=dims[0]
+            if count == 0:
+                return None
+
+            # FITS image data are stored big endian
+            dtype=hdu[0:1].dtype.newbyteorder('>')
+
+            offsets=hdu.get_offsets()
+
+            with open(self._filename,'rb') as fobj:
+                mapped=mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+
+            data=numpy.frombuffer(
+                mapped,
+                dtype=dtype,
+                count=count,
+                offset=offsets['data_start'],
+            )
+
+            # verify against a normal read in case the data are scaled
+            # or otherwise not raw
+            ncheck=min(count, 1024)
+            if not numpy.array_equal(data[0:ncheck], hdu[0:ncheck]):
+                return None
+
+            return data
+        except Exception:
+            return None
+
+    def _get_hdu(self, type):
+        """
+        Get the cutouts HDU for the indicated cutout type, caching
+        the handle for reuse
+        """
+        if type not in self._hdu_cache:
+            extname=self._get_extension_name(type)
+            self._hdu_cache[type] = self._fits[extname]
+        return self._hdu_cache[type]
 
     def _get_extension_name(self, type):
         if type=='image':
@@ -831,11 +1195,12 @@ class MEDS(object):
 
 
     def _check_indices(self, iobj, icutout=None):
-        if iobj >= self._cat.size:
+        ncutouts=self['ncutout']
+        if iobj >= ncutouts.size:
             raise ValueError("object index should be within "
-                             "[0,%s)" % self._cat.size)
+                             "[0,%s)" % ncutouts.size)
 
-        ncutout=self._cat['ncutout'][iobj]
+        ncutout=ncutouts[iobj]
         if ncutout==0:
             raise ValueError("object %s has no cutouts" % iobj)
 
@@ -848,7 +1213,17 @@ class MEDS(object):
     def __repr__(self):
         return repr(self._fits['object_data'])
     def __getitem__(self, item):
-        return self._cat[item]
+        # only single column names are cached; rows, slices and column
+        # lists keep the full-catalog recarray semantics
+        if not isinstance(item, str):
+            return self._cat[item]
+
+        if item not in self._col_cache:
+            if self.__cat is not None:
+                self._col_cache[item] = self.__cat[item]
+            else:
+                self._col_cache[item] = self._fits["object_data"][item][:]
+        return self._col_cache[item]
 
     def __enter__(self):
         return self
@@ -858,24 +1233,82 @@ class MEDS(object):
 
     @property
     def size(self):
-        return self._cat.size
+        if self.__nrows is None:
+            self.__nrows=self._fits["object_data"].get_nrows()
+        return self.__nrows
+
+if _have_numba:
+    @numba.njit(cache=True, fastmath=True)
+    def _composite_image_kernel(cim, coadd_seg,
+                                rowcen, colcen,
+                                coadd_rowcen, coadd_colcen,
+                                arow, brow, acol, bcol,
+                                segid):
+        """
+        Zero pixels in cim that map outside the coadd seg map or onto
+        a different object.  Writes cim in place with no temporaries.
+        """
+        nrow=coadd_seg.shape[0]
+        ncol=coadd_seg.shape[1]
 
-def split_mosaic(mosaic):
+        for i in range(cim.shape[0]):
+            rowrel = i - rowcen
+            for j in range(cim.shape[1]):
+                colrel = j - colcen
+
+                crow = int(numpy.rint(coadd_rowcen + rowrel*arow + colrel*brow))
+                ccol = int(numpy.rint(coadd_colcen + rowrel*acol + colrel*bcol))
+
+                if crow < 0 or crow >= nrow or ccol < 0 or ccol >= ncol:
+                    cim[i,j] = 0
+                else:
+                    segval = coadd_seg[crow,ccol]
+                    if segval != segid and segval != 0:
+                        cim[i,j] = 0
+
+def _as_native(arr):
     """
-    Split the mosaic into a list of images.
+    Get a native byte order version of the array, copying only
+    when needed
+    """
+    if arr.dtype.isnative:
+        return arr
+    return arr.astype(arr.dtype.newbyteorder('='))
 
-    The images in the list share memory with the original.
+def _invert_jacobian(jacob):
+    """
+    Closed-form inverse of a 2x2 jacobian array.
+
+    Returns None if the jacobian is singular.
+    """
+    a=jacob[0,0]
+    b=jacob[0,1]
+    c=jacob[1,0]
+    d=jacob[1,1]
+
+    det = a*d - b*c
+    if det == 0.0:
+        return None
+
+    return numpy.array([[d,-b],[-c,a]])/det
+
+def _split_mosaic_3d(mosaic):
+    """
+    View the mosaic as a 3d array with shape (ncutout, box_size, box_size)
+
+    This is zero copy since the mosaic is C contiguous.
     """
     box_size=mosaic.shape[1]
-    ncutout = mosaic.shape[0]/box_size
+    ncutout = mosaic.shape[0]//box_size
+    return mosaic.reshape(ncutout, box_size, box_size)
 
-    imlist=[]
-    for i in xrange(ncutout):
-        r1=i*box_size
-        r2=(i+1)*box_size
-        imlist.append( mosaic[r1:r2, :] )
+def split_mosaic(mosaic):
+    """
+    Split the mosaic into a list of images.
 
-    return imlist
+    The images in the list share memory with the original.
+    """
+    return list(_split_mosaic_3d(mosaic))
 
 def reject_outliers(imlist, wtlist, nsigma=5.0, A=0.3):
     """
@@ -918,7 +1351,7 @@ def reject_outliers(imlist, wtlist, nsigma=5.0, A=0.3):
 
     med=numpy.median(imstack, axis=0)
 
-    for i in xrange(nim):
+    for i in range(nim):
         im=imlist[i]
         wt=wtlist[i]
 
@@ -2,6 +2,7 @@
     A class to extract a subset of the objects in a MEDS file
     and write to a new file using only the object numbers
 """
+from __future__ import print_function
 import os
 import fitsio
 import numpy
@@ -50,7 +51,7 @@ class MEDSNumberExtractor(object):
     def close(self):
         if self.cleanup:
             if os.path.exists(self.sub_file):
-                print 'removing sub file:',self.sub_file
+                print('removing sub file:',self.sub_file)
                 os.remove(self.sub_file)
 
     def _get_inds(self, data):
@@ -75,7 +76,7 @@ class MEDSNumberExtractor(object):
 
         ranges = []
         start = True
-        for w in xrange(len(data)):
+        for w in range(len(data)):
             if data['ncutout'][w] > 0:                
                 if start:
                     ranges.append([data['start_row'][w,0], \
@@ -111,7 +112,7 @@ class MEDSNumberExtractor(object):
     def _extract(self):
         
         with fitsio.FITS(self.meds_file) as infits:
-            print 'opening sub file:',self.sub_file
+            print('opening sub file:',self.sub_file)
             with fitsio.FITS(self.sub_file,'rw',clobber=True) as outfits:
 
                 #
@@ -124,8 +125,8 @@ class MEDSNumberExtractor(object):
                 if ranges[0][0] != -1:
                     # adjust to new start. If ranges[0][0]==-1 will all be -9999
                     loc = 0
-                    for i in xrange(len(obj_data)):
-                        for j in xrange(obj_data['ncutout'][i]):
+                    for i in range(len(obj_data)):
+                        for j in range(obj_data['ncutout'][i]):
                             obj_data['start_row'][i,j] = loc
                             loc += obj_data['box_size'][i]**2
 
@@ -163,7 +164,7 @@ class MEDSNumberExtractor(object):
                     del bmask_cutouts
 
     def _write_dummy(self, outfits):
-        print 'no objects with cutouts, writing dummy data'
+        print('no objects with cutouts, writing dummy data')
         dummy=numpy.zeros(2, dtype='f4') + -9999
         outfits.write(dummy, extname='image_cutouts')
         dummy=numpy.zeros(2, dtype='f4')